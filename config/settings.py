@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'users.profiling.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,10 +96,51 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+AUTHENTICATION_BACKENDS = ['users.backends.CachedPermissionBackend']
+
+# Cache alias holding permission sets and their versions. Point it to a shared
+# backend (e.g. Redis) when running more than one process, otherwise a change
+# only invalidates the cache of the process that made it and the others keep
+# the old permissions for up to PERMISSION_CACHE_TIMEOUT seconds.
+PERMISSION_CACHE = os.getenv('PERMISSION_CACHE', 'default')
+
+PERMISSION_CACHE_TIMEOUT = int(os.getenv('PERMISSION_CACHE_TIMEOUT', 300))
+
+# Embeds the user's permissions in access tokens so has_perm() needs no
+# queries. The claims are a snapshot: a revoked permission stays valid until
+# the access token expires (ACCESS_TOKEN_LIFETIME).
+PERMISSION_CLAIMS_IN_TOKEN = os.getenv('PERMISSION_CLAIMS_IN_TOKEN') == 'True'
+
+PERMISSION_CLAIM = 'perms'
+
+# Cache alias holding Idempotency-Key responses. Point it to a shared backend
+# (e.g. Redis) when running more than one process.
+IDEMPOTENCY_CACHE = os.getenv('IDEMPOTENCY_CACHE', 'default')
+
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 60 * 60))
+
+IDEMPOTENCY_LOCK_TIMEOUT = 30
+
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+
+# Requests sent with a signed X-Profile header (see the profiling_header
+# command) are always profiled; others with this probability.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_HEADER_MAX_AGE = 10 * 60
+
+PROFILING_BUFFER_SIZE = 50
+
+PROFILING_MAX_ROWS = 60
+
+# An empty value disables the slow query log.
+SLOW_QUERY_THRESHOLD_MS = os.getenv('SLOW_QUERY_THRESHOLD_MS', '200')
+SLOW_QUERY_THRESHOLD_MS = float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.JWTPermissionClaimsAuthentication',
     )
 }
 
@@ -111,4 +153,18 @@ SPECTACULAR_SETTINGS = {
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
+    'AUTH_TOKEN_CLASSES': ('users.tokens.AccessToken',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
 }
+
+# HS256 signs with SECRET_KEY. ES256 and EdDSA sign with the first of the PEM
+# private keys in JWT_PRIVATE_KEY_FILES; the others are only used to verify
+# tokens signed before a key rotation. The keys are loaded at startup.
+JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+
+JWT_PRIVATE_KEYS = [
+    Path(path).read_text() for path in os.getenv('JWT_PRIVATE_KEY_FILES', '').split()
+]
+
+JWKS_MAX_AGE = int(os.getenv('JWKS_MAX_AGE', 60 * 60))
@@ -5,12 +5,12 @@ from drf_spectacular.views import (
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from users.views import TokenObtainPairView, jwks, profiles_view
 
 urlpatterns = [
+    path('admin/profiles/', admin.site.admin_view(profiles_view), name='profiles'),
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('docs/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -26,4 +26,5 @@ urlpatterns = [
     ),
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('.well-known/jwks.json', jwks, name='jwks'),
 ]
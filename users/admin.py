@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from users.backends import invalidate_user_permissions
 from users.forms import CustomUserChangeForm, CustomUserCreationForm
 from users.models import CustomUser
 
@@ -43,5 +44,9 @@ class CustomUserAdmin(UserAdmin):
     ordering = ['email']
     filter_horizontal = ['groups', 'user_permissions']
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        invalidate_user_permissions(form.instance.pk)
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+def compact_permissions(permissions):
+    """
+    Groups 'app_label.codename' permission names by app label.
+    """
+    claims = {}
+    for name in sorted(permissions):
+        app_label, codename = name.split('.', 1)
+        claims.setdefault(app_label, []).append(codename)
+    return claims
+
+
+def expand_permissions(claims):
+    return {
+        f'{app_label}.{codename}'
+        for app_label, codenames in claims.items()
+        for codename in codenames
+    }
+
+
+class JWTPermissionClaimsAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that preloads the user's permission set from the token
+    claims, when present, so has_perm() does not query the database.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        claims = validated_token.get(settings.PERMISSION_CLAIM)
+        if claims is not None:
+            user._perm_cache = expand_permissions(claims)
+        return user
@@ -0,0 +1,150 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[settings.PERMISSION_CACHE]
+
+
+def _version_key(kind, pk):
+    return f'users:perms:{kind}:{pk}:version'
+
+
+def _entry_key(kind, pk, version):
+    return f'users:perms:{kind}:{pk}:{version}'
+
+
+def _get_versions(kind, pks):
+    """
+    Returns the current cache version for each pk, creating missing ones.
+    """
+    keys = {pk: _version_key(kind, pk) for pk in pks}
+    found = _cache().get_many(keys.values())
+    versions = {}
+    missing = {}
+    for pk, key in keys.items():
+        if key in found:
+            versions[pk] = found[key]
+        else:
+            versions[pk] = missing[key] = time.time_ns()
+    if missing:
+        _cache().set_many(missing, timeout=None)
+    return versions
+
+
+def _bump_versions(kind, pks):
+    """
+    Moves the given pks to a new version so cached entries are no longer read.
+
+    The bump is repeated once the current transaction commits, so a request
+    that read the old rows while the transaction was open can not store them
+    under the new version.
+    """
+    pks = list(pks)
+
+    def bump():
+        version = time.time_ns()
+        _cache().set_many({_version_key(kind, pk): version for pk in pks}, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def invalidate_user_permissions(*user_pks):
+    _bump_versions('user', user_pks)
+
+
+def invalidate_group_permissions(*group_pks):
+    _bump_versions('group', group_pks)
+
+
+def _perm_names(rows):
+    return {f'{app_label}.{codename}' for app_label, codename in rows}
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ModelBackend that keeps permission sets in the cache between requests.
+
+    Direct user permissions and group memberships are stored per user, group
+    permissions are stored per group. Both are versioned and invalidated by
+    the signal handlers in users.signals.
+    """
+
+    def get_user_permissions(self, user_obj, obj=None):
+        if not self._is_cacheable(user_obj, obj):
+            return super().get_user_permissions(user_obj, obj)
+        if not hasattr(user_obj, '_user_perm_cache'):
+            user_obj._user_perm_cache = self._get_user_entry(user_obj)['permissions']
+        return user_obj._user_perm_cache
+
+    def get_group_permissions(self, user_obj, obj=None):
+        if not self._is_cacheable(user_obj, obj):
+            return super().get_group_permissions(user_obj, obj)
+        if not hasattr(user_obj, '_group_perm_cache'):
+            group_pks = self._get_user_entry(user_obj)['groups']
+            user_obj._group_perm_cache = self._get_group_permissions(group_pks)
+        return user_obj._group_perm_cache
+
+    def _is_cacheable(self, user_obj, obj):
+        return (
+            obj is None
+            and user_obj.is_active
+            and not user_obj.is_anonymous
+            and not user_obj.is_superuser
+        )
+
+    def _get_user_entry(self, user_obj):
+        if hasattr(user_obj, '_perm_entry'):
+            return user_obj._perm_entry
+
+        version = _get_versions('user', [user_obj.pk])[user_obj.pk]
+        key = _entry_key('user', user_obj.pk, version)
+        entry = _cache().get(key)
+        if entry is None:
+            entry = {
+                'permissions': _perm_names(
+                    user_obj.user_permissions.values_list(
+                        'content_type__app_label', 'codename'
+                    )
+                ),
+                'groups': list(user_obj.groups.values_list('pk', flat=True)),
+            }
+            _cache().set(key, entry, timeout=settings.PERMISSION_CACHE_TIMEOUT)
+
+        user_obj._perm_entry = entry
+        return entry
+
+    def _get_group_permissions(self, group_pks):
+        if not group_pks:
+            return set()
+
+        versions = _get_versions('group', group_pks)
+        keys = {pk: _entry_key('group', pk, versions[pk]) for pk in group_pks}
+        found = _cache().get_many(keys.values())
+
+        permissions = set()
+        missing = [pk for pk, key in keys.items() if key not in found]
+        for pk, key in keys.items():
+            permissions |= found.get(key, set())
+
+        if missing:
+            fetched = {pk: set() for pk in missing}
+            rows = Permission.objects.filter(group__in=missing).values_list(
+                'group', 'content_type__app_label', 'codename'
+            )
+            for group_pk, app_label, codename in rows:
+                fetched[group_pk].add(f'{app_label}.{codename}')
+            _cache().set_many(
+                {keys[pk]: perms for pk, perms in fetched.items()},
+                timeout=settings.PERMISSION_CACHE_TIMEOUT,
+            )
+            for perms in fetched.values():
+                permissions |= perms
+
+        return permissions
@@ -0,0 +1,110 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+MAX_KEY_LENGTH = 255
+
+POLL_INTERVAL = 0.05
+
+
+class IdempotentMixin:
+    """
+    Replays the stored response of a request sent again with the same
+    Idempotency-Key header instead of running the view a second time.
+
+    Responses are kept in the IDEMPOTENCY_CACHE cache for IDEMPOTENCY_TTL
+    seconds. While the first request is in flight, duplicates poll the cache
+    for up to IDEMPOTENCY_WAIT_TIMEOUT seconds before giving up with a 409.
+    Server errors are not stored, so they can be retried.
+    """
+
+    idempotent_methods = ('POST',)
+    idempotency_ttl = None
+
+    def get_idempotency_ttl(self):
+        if self.idempotency_ttl is None:
+            return settings.IDEMPOTENCY_TTL
+        return min(self.idempotency_ttl, settings.IDEMPOTENCY_TTL)
+
+    def dispatch(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if request.method not in self.idempotent_methods or key is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'detail': f'Idempotency-Key must have 1 to {MAX_KEY_LENGTH} characters.'},
+                status=400,
+            )
+
+        cache = caches[settings.IDEMPOTENCY_CACHE]
+        cache_key = self._get_cache_key(request, key)
+        lock_key = f'{cache_key}:lock'
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        lock_token = uuid.uuid4().hex
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+            if cache.add(lock_key, lock_token, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return JsonResponse(
+                    {'detail': 'A request with this Idempotency-Key is still in progress.'},
+                    status=409,
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            # The previous holder may have stored its response just before
+            # releasing the lock.
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code < 500:
+                if hasattr(response, 'render'):
+                    response.render()
+                cache.set(
+                    cache_key,
+                    {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'headers': dict(response.items()),
+                        'content': response.content,
+                    },
+                    timeout=self.get_idempotency_ttl(),
+                )
+            return response
+        finally:
+            # If the view outlived IDEMPOTENCY_LOCK_TIMEOUT, the lock may now
+            # belong to a duplicate request and must be left alone. Django's
+            # cache API has no atomic compare-and-delete, so this only narrows
+            # the race: the lock can still expire and be taken by a duplicate
+            # between the get() and the delete(). Keep IDEMPOTENCY_LOCK_TIMEOUT
+            # well above the slowest expected response.
+            if cache.get(lock_key) == lock_token:
+                cache.delete(lock_key)
+
+    def _get_cache_key(self, request, key):
+        scope = '\n'.join([request.path, request.headers.get('Authorization', ''), key])
+        return f'idempotency:{hashlib.sha256(scope.encode()).hexdigest()}'
+
+    def _replay(self, stored, fingerprint):
+        if stored['fingerprint'] != fingerprint:
+            return JsonResponse(
+                {'detail': 'Idempotency-Key was already used with a different request body.'},
+                status=422,
+            )
+        response = HttpResponse(
+            stored['content'], status=stored['status'], headers=stored['headers']
+        )
+        response['Idempotent-Replayed'] = 'true'
+        return response
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from users.export import DEFAULT_CHUNK_SIZE, EXPORT_TYPES, export_users
+
+
+class Command(BaseCommand):
+    help = 'Streams all users as CSV or NDJSON, without password hashes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=EXPORT_TYPES, default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('-o', '--output', help='File to write to, defaults to stdout.')
+
+    def handle(self, *args, **options):
+        chunks = export_users(
+            export_type=options['type'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['output']:
+            mode = 'wb' if options['gzip'] else 'w'
+            newline = None if options['gzip'] else ''
+            with open(options['output'], mode, newline=newline) as output:
+                output.writelines(chunks)
+        elif options['gzip']:
+            sys.stdout.buffer.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
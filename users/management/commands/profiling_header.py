@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.profiling import PROFILE_HEADER, sign_profile_header
+
+
+class Command(BaseCommand):
+    help = 'Prints a signed header that makes the server profile a request.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{PROFILE_HEADER}: {sign_profile_header()}')
+        self.stderr.write(f'Valid for {settings.PROFILING_HEADER_MAX_AGE} seconds.')
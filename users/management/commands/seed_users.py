@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from users.seed import init_worker, seed_range
+
+
+class Command(BaseCommand):
+    help = 'Inserts deterministic fake users for load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument('--offset', type=int, default=0, help='Index of the first user.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--password', default='Str0ngP4ssw0d#123')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes, only used on PostgreSQL.',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        offset = options['offset']
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if count < 0 or batch_size < 1 or workers < 1:
+            raise CommandError('count must be >= 0, batch-size and workers must be >= 1.')
+
+        # Every seeded user shares one hash, so the hasher runs once.
+        password_hash = make_password(options['password'])
+        args = (options['seed'], password_hash, batch_size)
+        stop = offset + count
+
+        # SQLite allows a single writer, so only PostgreSQL seeds in parallel.
+        if workers == 1 or connection.vendor != 'postgresql':
+            seed_range(offset, stop, *args)
+        else:
+            # Ranges are aligned to batch_size so the generated rows do not
+            # depend on the number of workers.
+            per_worker = -(-count // workers // batch_size) * batch_size or batch_size
+            ranges = range(offset, stop, per_worker)
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                futures = [
+                    pool.submit(seed_range, start, min(start + per_worker, stop), *args)
+                    for start in ranges
+                ]
+                for future in futures:
+                    future.result()
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} users.'))
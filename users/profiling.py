@@ -0,0 +1,267 @@
+import itertools
+import logging
+import random
+import sys
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import partial
+
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+SIGNING_SALT = 'users.profiling'
+
+# Most recent profiles, browsable from the admin. Kept per process.
+profiles = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+
+_profile_ids = itertools.count(1)
+
+# Calls taking less than this fraction of the request are left out of the
+# rendered call tree.
+MIN_CALL_FRACTION = 0.005
+
+
+def sign_profile_header():
+    return signing.dumps('profile', salt=SIGNING_SALT)
+
+
+def _has_valid_header(request):
+    value = request.headers.get(PROFILE_HEADER)
+    if not value:
+        return False
+    try:
+        signing.loads(value, salt=SIGNING_SALT, max_age=settings.PROFILING_HEADER_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _short_path(filename):
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path):
+            return filename[len(path):].lstrip('/')
+    return filename
+
+
+class CallTreeProfiler:
+    """
+    Collects a call tree for the thread that enables it, using
+    sys.setprofile.
+
+    cProfile is built on sys.monitoring since Python 3.12, which is process
+    wide, so it would also record every other request the process serves in
+    the meantime. sys.setprofile only affects the calling thread.
+    """
+
+    def __init__(self):
+        self.root = {'duration': 0, 'children': {}}
+        self._stack = []
+        self._previous = None
+
+    def enable(self):
+        self._stack = [(self.root, None)]
+        self._previous = sys.getprofile()
+        sys.setprofile(self._dispatch)
+
+    def disable(self):
+        sys.setprofile(self._previous)
+        # Frames still open here belong to the code disabling the profiler.
+        self._stack = []
+
+    def _dispatch(self, frame, event, arg):
+        if event == 'call':
+            code = frame.f_code
+            key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+        elif event == 'c_call':
+            key = (getattr(arg, '__qualname__', repr(arg)), getattr(arg, '__module__', None), None)
+        else:
+            # 'return', 'c_return' and 'c_exception'. Returns from frames
+            # entered before enable() have nothing to pop.
+            if len(self._stack) > 1:
+                node, start = self._stack.pop()
+                node['duration'] += time.perf_counter() - start
+            return
+
+        children = self._stack[-1][0]['children']
+        node = children.get(key)
+        if node is None:
+            node = children[key] = {'duration': 0, 'children': {}}
+        self._stack.append((node, time.perf_counter()))
+
+    def render(self, max_rows):
+        """
+        Returns the call tree as text, slowest calls first, one per line.
+        """
+        total = sum(child['duration'] for child in self.root['children'].values())
+        lines = []
+
+        def walk(node, depth):
+            children = sorted(
+                node['children'].items(), key=lambda item: item[1]['duration'], reverse=True
+            )
+            for (name, location, lineno), child in children:
+                if len(lines) >= max_rows or child['duration'] < total * MIN_CALL_FRACTION:
+                    return
+                if lineno is None:
+                    label = f'{name} [{location or "builtin"}]'
+                else:
+                    label = f'{name} ({_short_path(location)}:{lineno})'
+                lines.append(f'{child["duration"] * 1000:10.3f} ms  {"  " * depth}{label}')
+                walk(child, depth + 1)
+
+        walk(self.root, 0)
+        return '\n'.join(lines)
+
+
+class SlowQueryLogger:
+    """
+    Execute wrapper that logs queries slower than SLOW_QUERY_THRESHOLD_MS,
+    with the database's EXPLAIN output for SELECT statements.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = (time.perf_counter() - start) * 1000
+
+        if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+            query = {
+                'sql': sql,
+                'duration': round(duration, 3),
+                'explain': self._explain(context['connection'], sql, params, many),
+            }
+            self.queries.append(query)
+            logger.warning('Slow query (%.3f ms): %s', duration, sql)
+        return result
+
+    def _explain(self, db, sql, params, many):
+        if many or not sql.lstrip().upper().startswith('SELECT'):
+            return None
+
+        # On PostgreSQL a failed EXPLAIN aborts the surrounding transaction,
+        # so inside one it runs in a savepoint that is rolled back on error.
+        savepoint = transaction.atomic(using=db.alias) if db.in_atomic_block else nullcontext()
+        self._explaining = True
+        try:
+            with savepoint, db.cursor() as cursor:
+                cursor.execute(f'{db.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(
+                    ' '.join(str(column) for column in row) for row in cursor.fetchall()
+                )
+        except DatabaseError as e:
+            return f'EXPLAIN failed: {e}'
+        finally:
+            self._explaining = False
+
+
+class CapturedStream:
+    """
+    Wraps streaming content so each chunk is produced inside capture(), and
+    calls finish once the stream is exhausted or closed.
+
+    Django closes the response even when its content was never iterated,
+    for example when the client disconnects first, so finish always runs,
+    and only once.
+    """
+
+    def __init__(self, content, capture, finish):
+        self.iterator = iter(content)
+        self.capture = capture
+        self.finish = finish
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        end = object()
+        with self.capture():
+            chunk = next(self.iterator, end)
+        if chunk is end:
+            self.close()
+            raise StopIteration
+        return chunk
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            self.finish()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests sent with a valid signed X-Profile header, or a random
+    PROFILING_SAMPLE_RATE fraction of them, and stores the call tree in the
+    profiles ring buffer. Slow queries are logged on every request unless
+    SLOW_QUERY_THRESHOLD_MS is None.
+
+    Only the thread serving the request is profiled, so concurrent requests
+    do not show up in each other's call trees. For streaming responses, such
+    as the user export, capturing continues while each chunk is produced and
+    the profile is stored once the stream is exhausted or closed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_queries = SlowQueryLogger()
+        profiler = CallTreeProfiler() if self._should_profile(request) else None
+
+        start = time.perf_counter()
+        with self._capture(slow_queries, profiler):
+            response = self.get_response(request)
+
+        def finish():
+            if profiler is not None:
+                self._store(request, response, profiler, slow_queries, start)
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = CapturedStream(
+                response.streaming_content, partial(self._capture, slow_queries, profiler), finish
+            )
+        else:
+            finish()
+        return response
+
+    def _should_profile(self, request):
+        if _has_valid_header(request):
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @contextmanager
+    def _capture(self, slow_queries, profiler):
+        with ExitStack() as stack:
+            if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+                stack.enter_context(connection.execute_wrapper(slow_queries))
+            if profiler is not None:
+                profiler.enable()
+                stack.callback(profiler.disable)
+            yield
+
+    def _store(self, request, response, profiler, slow_queries, start):
+        duration = (time.perf_counter() - start) * 1000
+        profiles.append({
+            'id': next(_profile_ids),
+            'timestamp': timezone.now(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration': round(duration, 3),
+            'call_tree': profiler.render(settings.PROFILING_MAX_ROWS),
+            'slow_queries': slow_queries.queries,
+        })
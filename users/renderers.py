@@ -0,0 +1,27 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept the export media types. The export is
+    streamed by the view itself, so these never render a response body.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class GzipRenderer(ExportRenderer):
+    media_type = 'application/gzip'
+    format = 'gzip'
+    charset = None
@@ -0,0 +1,83 @@
+import random
+from datetime import UTC, datetime, timedelta
+
+from django.db import connection
+
+from users.models import CustomUser
+
+FIRST_NAMES = [
+    'Ana', 'Arthur', 'Beatriz', 'Bruno', 'Camila', 'Carlos', 'Daniela', 'Diego',
+    'Eduarda', 'Felipe', 'Gabriela', 'Gustavo', 'Helena', 'Igor', 'Julia', 'Lucas',
+    'Mariana', 'Mateus', 'Natalia', 'Pedro', 'Rafaela', 'Rodrigo', 'Sofia', 'Thiago',
+]
+
+LAST_NAMES = [
+    'Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Dias', 'Ferreira', 'Gomes', 'Lima',
+    'Martins', 'Melo', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva',
+]
+
+DATE_JOINED_START = datetime(2020, 1, 1, tzinfo=UTC)
+
+DATE_JOINED_RANGE = int(timedelta(days=5 * 365).total_seconds())
+
+COPY_FIELDS = ['name', 'email', 'password', 'is_active', 'is_admin', 'is_superuser', 'date_joined']
+
+
+def fake_users(start, stop, seed, password_hash):
+    """
+    Yields user rows, as tuples of COPY_FIELDS, for the indexes in [start, stop).
+
+    The random generator is seeded from seed and start, so a given range
+    always produces the same rows regardless of which worker generates it.
+    """
+    rng = random.Random(f'{seed}-{start}')
+    for index in range(start, stop):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield (
+            f'{first_name} {last_name}',
+            f'{first_name.lower()}.{last_name.lower()}.{index}@example.com',
+            password_hash,
+            True,
+            False,
+            False,
+            DATE_JOINED_START + timedelta(seconds=rng.randrange(DATE_JOINED_RANGE)),
+        )
+
+
+def copy_users(rows):
+    """
+    Inserts rows with PostgreSQL COPY through the psycopg cursor.
+    """
+    table = connection.ops.quote_name(CustomUser._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field) for field in COPY_FIELDS)
+    with connection.cursor() as cursor:
+        with cursor.copy(f'COPY {table} ({columns}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def bulk_create_users(rows, batch_size):
+    CustomUser.objects.bulk_create(
+        (CustomUser(**dict(zip(COPY_FIELDS, row))) for row in rows),
+        batch_size=batch_size,
+    )
+
+
+def seed_range(start, stop, seed, password_hash, batch_size):
+    """
+    Seeds the users in [start, stop) in batches of batch_size rows.
+    """
+    for batch_start in range(start, stop, batch_size):
+        rows = fake_users(batch_start, min(batch_start + batch_size, stop), seed, password_hash)
+        if connection.vendor == 'postgresql':
+            copy_users(rows)
+        else:
+            bulk_create_users(rows, batch_size)
+    return stop - start
+
+
+def init_worker():
+    import django
+
+    django.setup()
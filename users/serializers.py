@@ -1,8 +1,42 @@
+from contextlib import nullcontext
+from functools import cache
+
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt import serializers as jwt_serializers
 
 from users.models import CustomUser
+from users.tokens import RefreshToken
+
+
+@cache
+def _email_unique_constraints():
+    """
+    Names of the database's unique constraints covering only the email column.
+    """
+    table = CustomUser._meta.db_table
+    column = CustomUser._meta.get_field('email').column
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {
+        name for name, constraint in constraints.items()
+        if constraint['unique'] and constraint['columns'] == [column]
+    }
+
+
+def _is_unique_email_violation(error):
+    # PostgreSQL reports the violated constraint by name.
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None and diag.constraint_name is not None:
+        return diag.constraint_name in _email_unique_constraints()
+
+    # SQLite only reports it in the message, as "UNIQUE constraint failed:
+    # <table>.<column>".
+    column = CustomUser._meta.get_field('email').column
+    return str(error).endswith(f'{CustomUser._meta.db_table}.{column}')
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -12,8 +46,36 @@ class CustomUserSerializer(serializers.ModelSerializer):
         read_only_fields = ['date_joined']
         extra_kwargs = {'password': {'write_only': True}}
 
+    def get_fields(self):
+        fields = super().get_fields()
+
+        # On registration the unique constraint on email is checked by the
+        # INSERT itself instead of a SELECT beforehand, see create().
+        if self.instance is None:
+            email = fields['email']
+            for validator in email.validators:
+                if isinstance(validator, UniqueValidator):
+                    self.unique_email_message = validator.message
+            email.validators = [
+                validator for validator in email.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+
+        return fields
+
     def create(self, validated_data):
-        return CustomUser.objects.create_user(**validated_data)
+        # A failed INSERT breaks the enclosing transaction, if any, so it
+        # needs a savepoint there. In autocommit mode it runs on its own.
+        atomic = transaction.atomic() if connection.in_atomic_block else nullcontext()
+        try:
+            with atomic:
+                return CustomUser.objects.create_user(**validated_data)
+        except IntegrityError as e:
+            if not _is_unique_email_violation(e):
+                raise
+            raise serializers.ValidationError(
+                {'email': [self.unique_email_message]}, code='unique'
+            )
 
     def update(self, instance, validated_data):
         if 'password' in validated_data:
@@ -43,3 +105,11 @@ class CustomUserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(errors)
 
         return data
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
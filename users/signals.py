@@ -0,0 +1,50 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from users.backends import invalidate_group_permissions, invalidate_user_permissions
+from users.models import CustomUser
+
+
+def _changed_pks(instance, action, reverse, pk_set, related_name):
+    """
+    Returns the pks whose cached permissions are affected by an m2m change.
+
+    Forward changes affect the instance itself. Reverse changes affect the
+    rows in pk_set, except for clear(), where they are read before removal.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            return [instance.pk]
+        return []
+    if action in ('post_add', 'post_remove'):
+        return list(pk_set)
+    if action == 'pre_clear':
+        return list(getattr(instance, related_name).values_list('pk', flat=True))
+    return []
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = _changed_pks(instance, action, reverse, pk_set, 'user_set')
+    if pks:
+        invalidate_user_permissions(*pks)
+
+
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = _changed_pks(instance, action, reverse, pk_set, 'user_set')
+    if pks:
+        invalidate_user_permissions(*pks)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    pks = _changed_pks(instance, action, reverse, pk_set, 'group_set')
+    if pks:
+        invalidate_group_permissions(*pks)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_group_permissions(instance.pk)
@@ -1,9 +1,36 @@
+import csv
+import gzip
+import io
+import json
+import threading
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.exceptions import TokenBackendError
 from rest_framework.test import APIClient, APITestCase
 
 from users.models import CustomUser
+from users.profiling import PROFILE_HEADER, SlowQueryLogger, profiles, sign_profile_header
+from users.seed import fake_users
+from users.tokens import (
+    AccessToken,
+    KeyRingTokenBackend,
+    RefreshToken,
+    check_token_backend,
+    get_token_backend,
+)
+from users.views import CustomUserCreateView
 
 
 class JWTTokenAuthenticationTest(APITestCase):
@@ -46,6 +73,12 @@ class JWTTokenAuthenticationTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('access', response.json())
 
+    def test_jwks_with_symmetric_algorithm(self):
+        response = self.client.get(reverse('jwks'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.json(), {'keys': []})
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
     def test_refresh_access_token_with_blank_refresh_token(self):
         refresh_token = ''
         data = {'refresh': refresh_token}
@@ -95,6 +128,73 @@ class CustomUserCreateViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('password', response.json())
 
+    def test_create_user_with_email_already_used(self):
+        CustomUser.objects.create_user(
+            email='johndoe@email.com', name='user test', password='Str0ngP4ssw0d#123'
+        )
+        response = self.client.post(
+            reverse('create'),
+            data={
+                'name': 'John Doe',
+                'email': 'johndoe@email.com',
+                'password': 'Str0ngP4ssw0d#123',
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertDictEqual(response.json(), {'email': ['user with this email already exists.']})
+
+    def test_create_user_with_other_integrity_error(self):
+        cause = Exception('new row violates check constraint "users_customuser_email_check"')
+        cause.diag = mock.Mock(constraint_name='users_customuser_email_check')
+        error = IntegrityError(str(cause))
+        error.__cause__ = cause
+        with mock.patch.object(CustomUser.objects, 'create_user', side_effect=error), \
+                mock.patch('users.serializers._email_unique_constraints',
+                           return_value={'users_customuser_email_key'}):
+            with self.assertRaises(IntegrityError):
+                self.client.post(
+                    reverse('create'),
+                    data={
+                        'name': 'John Doe',
+                        'email': 'johndoe@email.com',
+                        'password': 'Str0ngP4ssw0d#123',
+                    }
+                )
+
+    def test_create_user_with_email_unique_constraint_name(self):
+        cause = Exception('duplicate key value violates unique constraint')
+        cause.diag = mock.Mock(constraint_name='users_customuser_email_key')
+        error = IntegrityError(str(cause))
+        error.__cause__ = cause
+        with mock.patch.object(CustomUser.objects, 'create_user', side_effect=error), \
+                mock.patch('users.serializers._email_unique_constraints',
+                           return_value={'users_customuser_email_key'}):
+            response = self.client.post(
+                reverse('create'),
+                data={
+                    'name': 'John Doe',
+                    'email': 'johndoe@email.com',
+                    'password': 'Str0ngP4ssw0d#123',
+                }
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertDictEqual(response.json(), {'email': ['user with this email already exists.']})
+
+    def test_create_user_does_not_select_before_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('create'),
+                data={
+                    'name': 'John Doe',
+                    'email': 'johndoe@email.com',
+                    'password': 'Str0ngP4ssw0d#123',
+                }
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            [query for query in queries if query['sql'].startswith('SELECT')]
+        )
+
 
 class CustomUserRetrieveUpdateDestroyViewTest(APITestCase):
     def setUp(self):
@@ -332,3 +432,454 @@ class CustomUserRetrieveUpdateDestroyViewTest(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('password', response.json())
+
+
+class PermissionCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email='test@test.com', name='user test', password='Str0ngP4ssw0d#123'
+        )
+        self.group = Group.objects.create(name='editors')
+        self.change_perm = Permission.objects.get(codename='change_customuser')
+        self.delete_perm = Permission.objects.get(codename='delete_customuser')
+
+    def fresh_user(self):
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def test_permissions_are_cached_between_requests(self):
+        self.user.user_permissions.add(self.change_perm)
+        self.assertTrue(self.fresh_user().has_perm('users.change_customuser'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('users.change_customuser'))
+            self.assertFalse(user.has_perm('users.delete_customuser'))
+
+    def test_user_permissions_change_invalidates_cache(self):
+        self.assertFalse(self.fresh_user().has_perm('users.change_customuser'))
+        self.user.user_permissions.add(self.change_perm)
+        self.assertTrue(self.fresh_user().has_perm('users.change_customuser'))
+        self.user.user_permissions.clear()
+        self.assertFalse(self.fresh_user().has_perm('users.change_customuser'))
+
+    def test_group_membership_change_invalidates_cache(self):
+        self.group.permissions.add(self.delete_perm)
+        self.assertFalse(self.fresh_user().has_perm('users.delete_customuser'))
+        self.group.user_set.add(self.user)
+        self.assertTrue(self.fresh_user().has_perm('users.delete_customuser'))
+        self.group.user_set.clear()
+        self.assertFalse(self.fresh_user().has_perm('users.delete_customuser'))
+
+    def test_group_permissions_change_invalidates_cache(self):
+        self.user.groups.add(self.group)
+        self.assertFalse(self.fresh_user().has_perm('users.delete_customuser'))
+        self.group.permissions.add(self.delete_perm)
+        self.assertTrue(self.fresh_user().has_perm('users.delete_customuser'))
+        self.group.delete()
+        self.assertFalse(self.fresh_user().has_perm('users.delete_customuser'))
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'permissions': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'permissions',
+            },
+        },
+        PERMISSION_CACHE='permissions',
+    )
+    def test_permissions_are_cached_in_permission_cache(self):
+        self.fresh_user().has_perm('users.change_customuser')
+        key = f'users:perms:user:{self.user.pk}:version'
+        self.assertIsNotNone(caches['permissions'].get(key))
+        self.assertIsNone(cache.get(key))
+
+    @override_settings(PERMISSION_CLAIMS_IN_TOKEN=True)
+    def test_permission_claims_in_access_token(self):
+        self.user.user_permissions.add(self.change_perm)
+        response = self.client.post(
+            reverse('token_obtain_pair'),
+            data={'email': self.user.email, 'password': 'Str0ngP4ssw0d#123'},
+        )
+        access = AccessToken(response.json()['access'])
+        self.assertDictEqual(access['perms'], {'users': ['change_customuser']})
+        self.assertNotIn('perms', RefreshToken(response.json()['refresh']).payload)
+
+    @override_settings(PERMISSION_CLAIMS_IN_TOKEN=True)
+    def test_permission_claims_in_refreshed_access_token(self):
+        self.user.user_permissions.add(self.change_perm)
+        refresh = RefreshToken.for_user(self.user)
+        self.user.user_permissions.add(self.delete_perm)
+
+        response = self.client.post(reverse('token_refresh'), data={'refresh': str(refresh)})
+        access = AccessToken(response.json()['access'])
+        self.assertDictEqual(
+            access['perms'], {'users': ['change_customuser', 'delete_customuser']}
+        )
+
+    def test_no_permission_claims_by_default(self):
+        response = self.client.post(
+            reverse('token_obtain_pair'),
+            data={'email': self.user.email, 'password': 'Str0ngP4ssw0d#123'},
+        )
+        self.assertNotIn('perms', AccessToken(response.json()['access']).payload)
+
+
+class CustomUserExportViewTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_superuser(
+            email='admin@test.com', name='admin', password='Str0ngP4ssw0d#123'
+        )
+        self.user = CustomUser.objects.create_user(
+            email='test@test.com', name='user test', password='Str0ngP4ssw0d#123'
+        )
+
+    def get_export(self, user, accept=None, **params):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        headers = {'Accept': accept} if accept else {}
+        return self.client.get(reverse('export'), params, headers=headers)
+
+    def test_export_with_non_admin_user(self):
+        response = self.get_export(self.user)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_csv(self):
+        response = self.get_export(self.admin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['email'] for row in rows], [self.admin.email, self.user.email])
+        self.assertNotIn('password', rows[0])
+
+    def test_export_csv_escapes_formulas(self):
+        CustomUser.objects.create_user(
+            email='formula@test.com', name='=HYPERLINK("http://x")', password='Str0ngP4ssw0d#123'
+        )
+        response = self.get_export(self.admin)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[-1]['name'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(rows[0]['name'], self.admin.name)
+
+    def test_export_ndjson_gzip(self):
+        response = self.get_export(self.admin, type='ndjson', gzip='true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['email'] for row in rows], [self.admin.email, self.user.email])
+        self.assertNotIn('password', rows[0])
+
+    def test_export_with_accept_header(self):
+        for accept, content_type in [
+            ('text/csv', 'text/csv'),
+            ('application/x-ndjson', 'application/x-ndjson'),
+            ('application/gzip', 'application/gzip'),
+        ]:
+            with self.subTest(accept=accept):
+                response = self.get_export(self.admin, accept=accept)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response['Content-Type'], content_type)
+
+        response = self.get_export(self.admin, accept='application/x-ndjson')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(content.splitlines()[0])['email'], self.admin.email)
+
+    def test_export_with_accept_header_and_non_admin_user(self):
+        response = self.get_export(self.user, accept='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertDictEqual(
+            response.json(),
+            {'detail': 'You do not have permission to perform this action.'}
+        )
+
+    def test_export_with_unknown_type(self):
+        response = self.get_export(self.admin, type='xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('type', response.json())
+
+    def test_export_users_command(self):
+        out = io.StringIO()
+        call_command('export_users', '--type', 'ndjson', '--chunk-size', '1', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['email'] for row in rows], [self.admin.email, self.user.email])
+
+
+class SeedUsersCommandTest(APITestCase):
+    def test_seed_users(self):
+        call_command('seed_users', '--count', '25', '--batch-size', '10', stdout=io.StringIO())
+        self.assertEqual(CustomUser.objects.count(), 25)
+        user = CustomUser.objects.first()
+        self.assertTrue(user.check_password('Str0ngP4ssw0d#123'))
+
+    def test_seed_users_is_deterministic(self):
+        call_command('seed_users', '--count', '5', '--seed', '7', stdout=io.StringIO())
+        emails = [row[1] for row in fake_users(0, 5, seed=7, password_hash='')]
+        self.assertListEqual(
+            list(CustomUser.objects.order_by('pk').values_list('email', flat=True)),
+            emails,
+        )
+
+
+class IdempotencyKeyTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.data = {
+            'name': 'John Doe',
+            'email': 'johndoe@email.com',
+            'password': 'Str0ngP4ssw0d#123',
+        }
+
+    def test_create_user_replays_response(self):
+        first = self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertDictEqual(first.json(), second.json())
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_create_user_with_reused_key_and_different_body(self):
+        self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(
+            reverse('create'),
+            data={**self.data, 'email': 'other@email.com'},
+            HTTP_IDEMPOTENCY_KEY='abc',
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_create_user_without_key_is_not_replayed(self):
+        self.client.post(reverse('create'), data=self.data)
+        response = self.client.post(reverse('create'), data=self.data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_create_user_with_key_in_flight(self):
+        with mock.patch('users.idempotency.IdempotentMixin._get_cache_key', return_value='key'):
+            cache.add('key:lock', True)
+            response = self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(CustomUser.objects.exists())
+
+    def test_lock_taken_over_by_duplicate_is_not_released(self):
+        def perform_create(view, serializer):
+            # The lock expired while the view ran and a duplicate took it.
+            cache.set('key:lock', 'other request')
+            serializer.save()
+
+        with mock.patch('users.idempotency.IdempotentMixin._get_cache_key', return_value='key'), \
+                mock.patch.object(CustomUserCreateView, 'perform_create', perform_create):
+            self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(cache.get('key:lock'), 'other request')
+
+    def test_obtain_token_pair_replays_response(self):
+        CustomUser.objects.create_user(**self.data)
+        data = {'email': self.data['email'], 'password': self.data['password']}
+        first = self.client.post(reverse('token_obtain_pair'), data=data, HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post(reverse('token_obtain_pair'), data=data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertDictEqual(first.json(), second.json())
+
+    def test_obtain_token_pair_ttl_is_capped_at_access_token_lifetime(self):
+        CustomUser.objects.create_user(**self.data)
+        data = {'email': self.data['email'], 'password': self.data['password']}
+        with mock.patch.object(type(caches['default']), 'set', autospec=True) as cache_set:
+            self.client.post(reverse('token_obtain_pair'), data=data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 30 * 60)
+
+    def test_create_user_ttl_is_not_capped(self):
+        with mock.patch.object(type(caches['default']), 'set', autospec=True) as cache_set:
+            self.client.post(reverse('create'), data=self.data, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 24 * 60 * 60)
+
+
+def generate_pem(private_key):
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+class KeyRingTokenBackendTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.new_key = generate_pem(ec.generate_private_key(ec.SECP256R1()))
+        self.old_key = generate_pem(ec.generate_private_key(ec.SECP256R1()))
+        self.backend = KeyRingTokenBackend('ES256', [self.new_key, self.old_key])
+
+    def test_encode_and_decode(self):
+        token = self.backend.encode({'user_id': '1'})
+        self.assertEqual(jwt.get_unverified_header(token)['kid'], self.backend.kid)
+        self.assertEqual(self.backend.decode(token)['user_id'], '1')
+
+    def test_decode_token_signed_with_rotated_key(self):
+        old_backend = KeyRingTokenBackend('ES256', [self.old_key])
+        token = old_backend.encode({'user_id': '1'})
+        self.assertEqual(self.backend.decode(token)['user_id'], '1')
+
+    def test_decode_token_signed_with_unknown_key(self):
+        other_key = generate_pem(ec.generate_private_key(ec.SECP256R1()))
+        other_backend = KeyRingTokenBackend('ES256', [other_key])
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(other_backend.encode({'user_id': '1'}))
+
+    def test_check_token_backend_with_invalid_configuration(self):
+        for algorithm, keys in [('ES999', []), ('ES256', []), ('ES256', ['not a key'])]:
+            with self.subTest(algorithm=algorithm, keys=keys):
+                with override_settings(JWT_ALGORITHM=algorithm, JWT_PRIVATE_KEYS=keys):
+                    get_token_backend.cache_clear()
+                    with self.assertRaises(ImproperlyConfigured):
+                        check_token_backend()
+        get_token_backend.cache_clear()
+
+    def test_eddsa(self):
+        key = generate_pem(ed25519.Ed25519PrivateKey.generate())
+        backend = KeyRingTokenBackend('EdDSA', [key])
+        self.assertEqual(backend.decode(backend.encode({'user_id': '1'}))['user_id'], '1')
+
+    def test_verify_access_token_with_jwks(self):
+        user = CustomUser.objects.create_user(
+            email='test@test.com', name='user test', password='Str0ngP4ssw0d#123'
+        )
+        with mock.patch('users.tokens.get_token_backend', return_value=self.backend), \
+                mock.patch('users.views.get_token_backend', return_value=self.backend):
+            jwks = self.client.get(reverse('jwks')).json()
+            response = self.client.post(
+                reverse('token_obtain_pair'),
+                data={'email': user.email, 'password': 'Str0ngP4ssw0d#123'},
+            )
+            access = response.json()['access']
+
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+            response = self.client.get(
+                reverse('retrieve-update-destroy', kwargs={'pk': user.pk})
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(jwks['keys']), 2)
+        key = jwt.PyJWKSet.from_dict(jwks)[jwt.get_unverified_header(access)['kid']]
+        payload = jwt.decode(access, key.key, algorithms=['ES256'])
+        self.assertEqual(payload['user_id'], str(user.pk))
+
+
+def _busy_other_thread():
+    return sum(range(1000))
+
+
+class ProfilingMiddlewareTest(APITestCase):
+    def setUp(self):
+        profiles.clear()
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_superuser(
+            email='admin@test.com', name='admin', password='Str0ngP4ssw0d#123'
+        )
+        self.url = reverse('retrieve-update-destroy', kwargs={'pk': self.admin.pk})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+
+    def test_profile_request_with_signed_header(self):
+        response = self.client.get(self.url, headers={PROFILE_HEADER: sign_profile_header()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['path'], self.url)
+        self.assertIn('APIView.dispatch', profiles[0]['call_tree'])
+
+    def test_other_threads_are_not_profiled(self):
+        done = threading.Event()
+
+        def other_request():
+            while not done.is_set():
+                _busy_other_thread()
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        try:
+            with override_settings(PROFILING_MAX_ROWS=10_000):
+                self.client.get(self.url, headers={PROFILE_HEADER: sign_profile_header()})
+        finally:
+            done.set()
+            thread.join()
+        self.assertNotIn('_busy_other_thread', profiles[0]['call_tree'])
+
+    def test_request_with_invalid_header_is_not_profiled(self):
+        self.client.get(self.url, headers={PROFILE_HEADER: 'profile'})
+        self.client.get(self.url)
+        self.assertEqual(len(profiles), 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_profiled(self):
+        self.client.get(self.url)
+        self.assertEqual(len(profiles), 1)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_captured_with_explain(self):
+        with self.assertLogs('users.profiling', level='WARNING'):
+            self.client.get(self.url, headers={PROFILE_HEADER: sign_profile_header()})
+        query = profiles[0]['slow_queries'][0]
+        self.assertTrue(query['sql'].startswith('SELECT'))
+        self.assertIsNotNone(query['explain'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_failed_explain_is_rolled_back_to_a_savepoint(self):
+        slow_queries = SlowQueryLogger()
+        with mock.patch.object(connection.ops, 'explain_query_prefix', return_value='BOGUS'), \
+                CaptureQueriesContext(connection) as queries, \
+                self.assertLogs('users.profiling', level='WARNING'), \
+                connection.execute_wrapper(slow_queries):
+            CustomUser.objects.count()
+        self.assertTrue(slow_queries.queries[0]['explain'].startswith('EXPLAIN failed'))
+        self.assertTrue(
+            any(query['sql'].startswith('ROLLBACK TO SAVEPOINT') for query in queries)
+        )
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_slow_query_log_can_be_disabled(self):
+        with mock.patch.object(SlowQueryLogger, '__call__') as logger_call:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        logger_call.assert_not_called()
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, PROFILING_MAX_ROWS=10_000)
+    def test_streaming_response_is_captured_until_exhausted(self):
+        with self.assertLogs('users.profiling', level='WARNING'):
+            response = self.client.get(
+                reverse('export'), headers={PROFILE_HEADER: sign_profile_header()}
+            )
+            self.assertEqual(len(profiles), 0)
+            b''.join(response.streaming_content)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(
+            any('ORDER BY' in query['sql'] for query in profiles[0]['slow_queries'])
+        )
+        self.assertIn('iter_csv', profiles[0]['call_tree'])
+
+    def test_streaming_response_closed_before_iteration_is_stored_once(self):
+        response = self.client.get(
+            reverse('export'), headers={PROFILE_HEADER: sign_profile_header()}
+        )
+        self.assertEqual(len(profiles), 0)
+        response.close()
+        response.close()
+        self.assertEqual(len(profiles), 1)
+
+    def test_profiles_admin_page(self):
+        self.client.get(self.url, headers={PROFILE_HEADER: sign_profile_header()})
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('profiles'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, self.url)
+
+    def test_profiles_admin_page_with_non_admin_user(self):
+        user = CustomUser.objects.create_user(
+            email='test@test.com', name='user test', password='Str0ngP4ssw0d#123'
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse('profiles'))
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import json
+from functools import cache, cached_property
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+from users.authentication import compact_permissions
+
+# Members of the public JWK used for the RFC 7638 thumbprint, by key type.
+THUMBPRINT_MEMBERS = {
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+    'RSA': ('e', 'kty', 'n'),
+}
+
+
+def _thumbprint(jwk):
+    members = {name: jwk[name] for name in THUMBPRINT_MEMBERS[jwk['kty']]}
+    digest = hashlib.sha256(
+        json.dumps(members, separators=(',', ':'), sort_keys=True).encode()
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    TokenBackend that signs with the first of several private keys and
+    verifies with any of them, picked by the 'kid' header.
+
+    Keys are parsed once per process. To rotate, put the new key first and
+    keep the old one until the tokens it signed have expired.
+    """
+
+    def __init__(self, algorithm, private_keys=(), **kwargs):
+        signing_key = api_settings.SIGNING_KEY if algorithm.startswith('HS') else None
+        super().__init__(algorithm, signing_key, **kwargs)
+        self.private_keys = list(private_keys)
+
+        if not self.is_asymmetric:
+            return
+        if not self.private_keys:
+            raise TokenBackendError(
+                _('At least one private key is required to use {}.').format(algorithm)
+            )
+
+        jws_algorithm = jwt.PyJWS().get_algorithm_by_name(algorithm)
+        self.keys = {}
+        for pem in self.private_keys:
+            private_key = jws_algorithm.prepare_key(pem)
+            public_jwk = jws_algorithm.to_jwk(private_key.public_key(), as_dict=True)
+            kid = _thumbprint(public_jwk)
+            public_jwk.update({'kid': kid, 'use': 'sig', 'alg': algorithm})
+            self.keys[kid] = (private_key, private_key.public_key(), public_jwk)
+        self.kid = next(iter(self.keys))
+
+    @property
+    def is_asymmetric(self):
+        return not self.algorithm.startswith('HS')
+
+    @cached_property
+    def prepared_signing_key(self):
+        if self.is_asymmetric:
+            return self.keys[self.kid][0]
+        return super().prepared_signing_key
+
+    @cached_property
+    def jwks(self):
+        """
+        The public keys as an encoded JWK Set.
+        """
+        keys = [key[2] for key in self.keys.values()] if self.is_asymmetric else []
+        return json.dumps({'keys': keys}).encode()
+
+    def get_verifying_key(self, token):
+        if not self.is_asymmetric:
+            return super().get_verifying_key(token)
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_('Token is invalid')) from e
+        if kid not in self.keys:
+            raise TokenBackendError(_('Token is invalid'))
+        return self.keys[kid][1]
+
+    def encode(self, payload):
+        if not self.is_asymmetric:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        return jwt.encode(
+            jwt_payload,
+            self.prepared_signing_key,
+            algorithm=self.algorithm,
+            headers={'kid': self.kid},
+            json_encoder=self.json_encoder,
+        )
+
+
+@cache
+def get_token_backend():
+    return KeyRingTokenBackend(
+        settings.JWT_ALGORITHM,
+        settings.JWT_PRIVATE_KEYS,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
+
+
+def check_token_backend():
+    """
+    Builds the token backend, so a bad JWT_ALGORITHM or key fails at startup
+    instead of on the first token encoded or decoded.
+    """
+    try:
+        get_token_backend()
+    except (TokenBackendError, jwt.PyJWTError, ValueError, NotImplementedError) as e:
+        get_token_backend.cache_clear()
+        raise ImproperlyConfigured(f'Invalid JWT signing configuration: {e}') from e
+
+
+class KeyRingTokenMixin:
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.user = user
+        return token
+
+    @property
+    def access_token(self):
+        """
+        Adds the permission claims to access tokens issued both on login and
+        on refresh, when PERMISSION_CLAIMS_IN_TOKEN is enabled.
+        """
+        access = super().access_token
+        if not settings.PERMISSION_CLAIMS_IN_TOKEN:
+            return access
+
+        user = getattr(self, 'user', None)
+        if user is None:
+            user = get_user_model().objects.get(
+                **{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}
+            )
+
+        # Superusers pass every has_perm() check without a query, so the
+        # claims are only worth embedding for regular users.
+        if not user.is_superuser:
+            access[settings.PERMISSION_CLAIM] = compact_permissions(
+                user.get_all_permissions()
+            )
+        return access
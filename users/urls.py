@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.CustomUserCreateView.as_view(), name='create'),
+    path('export/', views.CustomUserExportView.as_view(), name='export'),
     path(
         '<int:pk>/',
         views.CustomUserRetrieveUpdateDestroyView.as_view(),
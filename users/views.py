@@ -1,11 +1,28 @@
+from django.conf import settings
+from django.contrib import admin
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.settings import api_settings
 
+from users.export import EXPORT_TYPES, export_users
+from users.idempotency import IdempotentMixin
 from users.models import CustomUser
 from users.permissions import IsOwnerOrReadOnly
+from users.profiling import profiles
+from users.renderers import CSVRenderer, ExportRenderer, GzipRenderer, NDJSONRenderer
 from users.serializers import CustomUserSerializer
+from users.tokens import get_token_backend
 
 
-class CustomUserCreateView(generics.CreateAPIView):
+class CustomUserCreateView(IdempotentMixin, generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.AllowAny]
@@ -19,3 +36,68 @@ class CustomUserRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
     def perform_destroy(self, instance):
         instance.is_active = False
         instance.save()
+
+
+class CustomUserExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [CSVRenderer, NDJSONRenderer, GzipRenderer, JSONRenderer]
+
+    def get(self, request):
+        # ?type= and ?gzip= take precedence over the Accept header.
+        accepted_format = request.accepted_renderer.format
+        default_type = accepted_format if accepted_format in EXPORT_TYPES else 'csv'
+        export_type = request.query_params.get('type', default_type)
+        if export_type not in EXPORT_TYPES:
+            raise ValidationError({'type': [f'Must be one of: {", ".join(EXPORT_TYPES)}.']})
+
+        compress = (
+            request.query_params.get('gzip') in ('1', 'true')
+            or isinstance(request.accepted_renderer, GzipRenderer)
+        )
+        filename = f'users.{export_type}'
+        content_type = EXPORT_TYPES[export_type]
+        if compress:
+            filename += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(
+            export_users(export_type=export_type, compress=compress),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Errors are rendered as JSON whatever export type was accepted.
+        if (
+            isinstance(response, Response)
+            and isinstance(response.accepted_renderer, ExportRenderer)
+        ):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+        return response
+
+
+class TokenObtainPairView(IdempotentMixin, jwt_views.TokenObtainPairView):
+    def get_idempotency_ttl(self):
+        # A replayed access token must not outlive its own expiry.
+        lifetime = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+        return min(lifetime, super().get_idempotency_ttl())
+
+
+@require_GET
+def jwks(request):
+    response = HttpResponse(get_token_backend().jwks, content_type='application/json')
+    patch_cache_control(response, public=True, max_age=settings.JWKS_MAX_AGE)
+    return response
+
+
+def profiles_view(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        # Snapshot the buffer, other threads append to it while this renders.
+        'profiles': list(reversed(profiles)),
+    }
+    return TemplateResponse(request, 'admin/users/profiles.html', context)